@@ -0,0 +1,3 @@
+"""
+Modules shared by the key generator and the signature application.
+"""
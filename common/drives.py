@@ -0,0 +1,259 @@
+"""
+Removable drive detection shared by both applications.
+
+Qt-free, so the USB detector threads of both applications use the same
+scanning code and it can be tested without a display.
+"""
+import os
+import re
+import select
+import subprocess
+import time
+import psutil
+
+# Volumes in /Volumes that are never removable drives
+SYSTEM_VOLUME_PATTERN = re.compile(r"Macintosh|System|Time Machine|com\.apple")
+
+# Filesystem types of USB drives in /proc/self/mountinfo on Linux
+REMOVABLE_FILESYSTEMS = {b"vfat", b"exfat", b"ntfs", b"ntfs3", b"fuseblk"}
+
+# Octal escapes (\040 for a space, ...) used in mountinfo paths
+MOUNTINFO_ESCAPE_PATTERN = re.compile(rb"\\([0-7]{3})")
+
+# Rescan interval bounds in seconds where no notification source exists.
+# Backing off past two seconds would make a drive plugged in after a
+# quiet period noticeably slower to show up.
+MIN_POLL_INTERVAL = 1
+MAX_POLL_INTERVAL = 2
+
+# Rescans after a change in /Volumes on macOS, one per second, since the
+# notification can arrive before the new volume is mounted
+FOLLOW_UP_RESCANS = 3
+
+def unescape_mountinfo(field):
+    """
+    Decode a path field of /proc/self/mountinfo.
+
+    Args:
+        field (bytes): Field with octal escapes
+
+    Returns:
+        str: Decoded path
+    """
+    return os.fsdecode(MOUNTINFO_ESCAPE_PATTERN.sub(
+        lambda match: bytes([int(match.group(1), 8)]), field))
+
+def is_removable_device(device):
+    """
+    Check if a mounted block device is on a USB or removable disk.
+
+    Internal disks are skipped, so for example the FAT formatted EFI
+    system partition mounted at /boot/efi is not taken for a drive.
+
+    Args:
+        device (str): Mount source from the mount table, e.g. /dev/sdb1
+
+    Returns:
+        bool: True if the device is on a USB or removable disk
+    """
+    if not device.startswith("/dev/"):
+        return False
+
+    # Resolve /dev/disk/by-* links to the kernel device name
+    name = os.path.basename(os.path.realpath(device))
+    sys_path = os.path.realpath(os.path.join("/sys/class/block", name))
+
+    # USB disks sit below a USB controller in the device tree
+    if "/usb" in sys_path:
+        return True
+
+    # Card readers and similar media set the removable flag on the
+    # disk, which for a partition is its parent
+    for path in (sys_path, os.path.dirname(sys_path)):
+        try:
+            with open(os.path.join(path, "removable"), "rb") as f:
+                if f.read().strip() == b"1":
+                    return True
+        except OSError:
+            pass
+    return False
+
+def parse_mount_output(output):
+    """
+    Select removable drives from the output of the macOS mount command.
+
+    Volumes outside /Volumes, system volumes, Time Machine backups,
+    network shares, hidden (nobrowse) and read-only volumes are skipped.
+
+    Args:
+        output (str): Output of /sbin/mount
+
+    Returns:
+        set: Mount points of removable drives
+    """
+    drives = set()
+    for line in output.splitlines():
+        # Format: <device> on <mount point> (<flag>, <flag>, ...)
+        _, _, mount_info = line.partition(" on ")
+        volume_path, _, flags = mount_info.rpartition(" (")
+        if not volume_path.startswith("/Volumes/"):
+            continue
+
+        # Skip system volumes and Time Machine backups
+        if SYSTEM_VOLUME_PATTERN.search(os.path.basename(volume_path)):
+            continue
+
+        # Keep local, writable volumes shown in Finder
+        flags = flags.rstrip(")").split(", ")
+        if "local" in flags and "read-only" not in flags and "nobrowse" not in flags:
+            drives.add(volume_path)
+    return drives
+
+def parse_mountinfo(mountinfo):
+    """
+    Select removable drives from the Linux mount table.
+
+    Mounts with filesystems used on USB drives (FAT, exFAT, NTFS) whose
+    device is a USB or removable disk are kept. Lines that do not parse
+    are skipped.
+
+    Args:
+        mountinfo (bytes): Content of /proc/self/mountinfo
+
+    Returns:
+        set: Mount points of removable drives
+    """
+    drives = set()
+    for line in mountinfo.splitlines():
+        # Format: <id> <parent> <major:minor> <root> <mount point> <options>
+        # [<optional fields>] - <filesystem type> <source> <super options>
+        mount_fields, separator, filesystem_fields = line.partition(b" - ")
+        mount_fields = mount_fields.split(b" ")
+        filesystem_fields = filesystem_fields.split(b" ")
+        if not separator or len(mount_fields) < 5 or len(filesystem_fields) < 2:
+            continue
+
+        filesystem_type, source = filesystem_fields[:2]
+        if (filesystem_type in REMOVABLE_FILESYSTEMS
+                and is_removable_device(unescape_mountinfo(source))):
+            drives.add(unescape_mountinfo(mount_fields[4]))
+    return drives
+
+def get_removable_drives(system):
+    """
+    Get the set of removable drives connected to the system.
+
+    On macOS:
+    - Lists mounted volumes under /Volumes with a single mount call
+      (see parse_mount_output)
+
+    On Linux:
+    - Reads the mount table from /proc/self/mountinfo (see parse_mountinfo)
+
+    On Windows:
+    - Uses psutil to detect removable drives and CD-ROMs
+    - Identifies drives based on 'removable' or 'cdrom' mount options
+
+    Args:
+        system (str): Name of the operating system, as platform.system()
+
+    Returns:
+        set: Set of absolute paths to mounted removable drives
+    """
+    if system == "Darwin":  # macOS
+        # A single mount call lists every volume with its flags, instead
+        # of a statvfs per volume, which can block on network shares
+        return parse_mount_output(subprocess.run(["/sbin/mount"], capture_output=True,
+                                                 text=True, check=True).stdout)
+    if system == "Linux":
+        # psutil only reports mount options on Linux, which never say
+        # 'removable', so read the mount table directly
+        with open("/proc/self/mountinfo", "rb") as f:
+            return parse_mountinfo(f.read())
+    # For other systems (Windows), use psutil
+    return {partition.mountpoint for partition in psutil.disk_partitions()
+            if 'removable' in partition.opts or 'cdrom' in partition.opts}
+
+class MountWatcher:
+    """
+    Waits for drives to be mounted or unmounted using OS notifications.
+
+    On Linux the kernel reports mount table changes through poll() on
+    /proc/self/mountinfo. On macOS /Volumes is watched with kqueue, and
+    a few more rescans follow each change because the mount point appears
+    before the volume is mounted on it.
+    Other systems have no notification source and fall back to polling,
+    backing off while the drives stay the same.
+    """
+    def __init__(self, system):
+        self.poll_interval = MIN_POLL_INTERVAL
+        self.waited = 0
+        self.pending_rescans = 0
+        self.fd = None
+        self.poller = None
+        self.kqueue = None
+        try:
+            if system == "Linux":
+                self.fd = os.open("/proc/self/mountinfo", os.O_RDONLY)
+                self.poller = select.poll()
+                self.poller.register(self.fd, select.POLLPRI | select.POLLERR)
+            elif system == "Darwin":
+                self.fd = os.open("/Volumes", os.O_RDONLY)
+                self.kqueue = select.kqueue()
+                self.kqueue.control([select.kevent(
+                    self.fd,
+                    filter=select.KQ_FILTER_VNODE,
+                    flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+                    fflags=select.KQ_NOTE_WRITE
+                )], 0, 0)
+        except (OSError, AttributeError):
+            # Notification source unavailable, poll instead
+            self.close()
+
+    def wait(self, timeout):
+        """
+        Wait until the set of mounted drives may have changed.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds
+
+        Returns:
+            bool: True if a change was reported (or may have happened when
+            polling), False if the timeout expired without a change
+        """
+        if self.poller is not None:
+            return bool(self.poller.poll(timeout * 1000))
+        if self.kqueue is not None:
+            if self.kqueue.control(None, 1, timeout):
+                self.pending_rescans = FOLLOW_UP_RESCANS
+                return True
+            if self.pending_rescans:
+                self.pending_rescans -= 1
+                return True
+            return False
+        time.sleep(timeout)
+        self.waited += timeout
+        if self.waited < self.poll_interval:
+            return False
+        self.waited = 0
+        # Rescan less often while nothing changes
+        self.poll_interval = min(self.poll_interval * 2, MAX_POLL_INTERVAL)
+        return True
+
+    def reset_backoff(self):
+        """
+        Poll at the shortest interval again after the drives changed.
+        """
+        self.poll_interval = MIN_POLL_INTERVAL
+
+    def close(self):
+        """
+        Release the notification source.
+        """
+        if self.kqueue is not None:
+            self.kqueue.close()
+        if self.fd is not None:
+            os.close(self.fd)
+        self.fd = None
+        self.poller = None
+        self.kqueue = None
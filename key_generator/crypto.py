@@ -5,7 +5,18 @@ import os
 import hashlib
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# Marks the encrypted private key file format:
+# KEY_FILE_MAGIC + salt (16 bytes) + nonce (12 bytes) + encrypted key + tag (16 bytes)
+KEY_FILE_MAGIC = b"ESK2"
+
+# scrypt cost parameters used to derive the AES key from the PIN
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+# scrypt needs 128 * r * n bytes (32 MiB); leave headroom above that
+SCRYPT_MAXMEM = 64 * 1024 * 1024
 
 def generate_rsa_keypair():
     """
@@ -52,43 +63,37 @@ def derive_key_from_pin(pin, salt=None):
     if salt is None:
         salt = os.urandom(16)
     
-    # Use PBKDF2 to derive a key from the PIN
-    key = hashlib.pbkdf2_hmac('sha256', pin.encode(), salt, 100000, 32)
+    # Use scrypt to derive a key from the PIN
+    key = hashlib.scrypt(pin.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R,
+                         p=SCRYPT_P, maxmem=SCRYPT_MAXMEM, dklen=32)
     
     return key, salt
 
 def encrypt_private_key(private_key_pem, pin):
     """
-    Encrypt the private key using AES-256 with a key derived from the PIN.
+    Encrypt the private key using AES-256-GCM with a key derived from the PIN.
     
     Args:
         private_key_pem (bytes): PEM-encoded private key
         pin (str): User PIN
         
     Returns:
-        bytes: Encrypted private key with salt and IV prepended
+        bytes: Encrypted private key with format marker, salt and nonce
+        prepended and the authentication tag appended
     """
     # Generate salt and derive key
     salt = os.urandom(16)
     key, _ = derive_key_from_pin(pin, salt)
     
-    # Generate random IV
-    iv = os.urandom(16)
-    
-    # Create AES cipher
-    cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
-    encryptor = cipher.encryptor()
-    
-    # Pad the private key to a multiple of 16 bytes (AES block size)
-    padded_data = private_key_pem
-    padding_length = 16 - (len(private_key_pem) % 16)
-    padded_data += bytes([padding_length]) * padding_length
+    # Generate random 96-bit nonce
+    nonce = os.urandom(12)
     
-    # Encrypt the private key
-    encrypted_key = encryptor.update(padded_data) + encryptor.finalize()
+    # Encrypt the private key in a single AES-GCM call (no padding needed);
+    # the result is the ciphertext with the authentication tag appended
+    encrypted_key = AESGCM(key).encrypt(nonce, private_key_pem, None)
     
-    # Return salt + IV + encrypted key
-    return salt + iv + encrypted_key
+    # Return format marker + salt + nonce + encrypted key and tag
+    return KEY_FILE_MAGIC + salt + nonce + encrypted_key
 
 def save_public_key(public_key_pem, directory):
     """
@@ -1,17 +1,21 @@
 """
 GUI implementation for the key generator application with USB detection.
 """
-import os
+import hmac
+import re
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QPushButton,
                              QLabel, QLineEdit, QFileDialog, QMessageBox,
                              QHBoxLayout, QStatusBar)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QSettings
 from usb_detector import USBDetector
-from crypto import generate_rsa_keypair, encrypt_private_key, save_public_key
+from workers import KeyGenerationWorker
 
 sizeX = 600
 sizeY = 400
 
+# PIN must consist of at least 6 ASCII digits
+PIN_PATTERN = re.compile(r"[0-9]{6,}")
+
 class KeyGeneratorWindow(QMainWindow):
     """
     Main window for the key generator application.
@@ -92,6 +96,10 @@ class KeyGeneratorWindow(QMainWindow):
         self.usb_detector.start_monitoring()
         self.usb_path = None
 
+        # Background key generation
+        self.keygen_worker = None
+        self.generating = False
+
         # Connect text change events for validation
         self.pin_input.textChanged.connect(self.validate_inputs)
         self.confirm_pin_input.textChanged.connect(self.validate_inputs)
@@ -105,10 +113,11 @@ class KeyGeneratorWindow(QMainWindow):
         confirm_pin = self.confirm_pin_input.text()
         public_key_path = self.public_key_path.text()
 
-        valid = bool(len(pin) >= 6 and pin.isdigit() and
-                 pin == confirm_pin and
+        valid = bool(PIN_PATTERN.fullmatch(pin) and
+                 hmac.compare_digest(pin.encode(), confirm_pin.encode()) and
                  public_key_path and
-                 self.usb_path is not None)
+                 self.usb_path is not None and
+                 not self.generating)
 
         self.generate_button.setEnabled(valid)
 
@@ -122,8 +131,12 @@ class KeyGeneratorWindow(QMainWindow):
         """
         Open file dialog to select public key storage location.
         """
-        folder = QFileDialog.getExistingDirectory(self, "Select Public Key Storage Location")
+        settings = QSettings("PAdES", "KeyGenerator")
+        folder = QFileDialog.getExistingDirectory(self, "Select Public Key Storage Location",
+                                                  settings.value("last_directory/public_key", "", type=str))
         if folder:
+            # Start from the same folder next time, also after a restart
+            settings.setValue("last_directory/public_key", folder)
             self.public_key_path.setText(folder)
 
     def on_usb_connected(self, path):
@@ -137,10 +150,14 @@ class KeyGeneratorWindow(QMainWindow):
         self.update_status(f"USB drive detected at {path}")
         self.validate_inputs()
 
-    def on_usb_disconnected(self):
+    def on_usb_disconnected(self, path):
         """
         Handle USB drive disconnection.
         """
+        # Ignore drives other than the one selected for the private key
+        if path != self.usb_path:
+            return
+
         self.usb_path = None
         self.usb_status.setText("USB Status: No USB drive detected")
         self.usb_status.setStyleSheet("color: red;")
@@ -151,17 +168,18 @@ class KeyGeneratorWindow(QMainWindow):
     def generate_keys(self):
         """
         Generate RSA key pair and store them in the specified locations.
+        The work runs in a background thread so the window stays responsive.
         """
         pin = self.pin_input.text()
         confirm_pin = self.confirm_pin_input.text()
         public_key_path = self.public_key_path.text()
 
         # Validate inputs
-        if not pin or len(pin) < 6 or not pin.isdigit():
+        if not PIN_PATTERN.fullmatch(pin):
             QMessageBox.warning(self, "Invalid PIN", "PIN must be at least 6 digits.")
             return
 
-        if pin != confirm_pin:
+        if not hmac.compare_digest(pin.encode(), confirm_pin.encode()):
             QMessageBox.warning(self, "PIN Mismatch", "PINs do not match.")
             return
 
@@ -173,43 +191,50 @@ class KeyGeneratorWindow(QMainWindow):
             QMessageBox.warning(self, "No Public Key Location", "Please select a location for the public key.")
             return
 
-        try:
-            # Generate RSA key pair
-            self.status_label.setText("Generating RSA key pair...")
-            self.update_status("Generating RSA key pair...")
-            private_key, public_key = generate_rsa_keypair()
-
-            # Encrypt private key with PIN
-            self.status_label.setText("Encrypting private key...")
-            self.update_status("Encrypting private key...")
-            encrypted_private_key = encrypt_private_key(private_key, pin)
-
-            # Save private key to USB drive
-            private_key_file_path = os.path.join(self.usb_path, "private_key.enc")
-            self.update_status(f"Saving private key to {private_key_file_path}...")
-            with open(private_key_file_path, 'wb') as f:
-                f.write(encrypted_private_key)
-
-            # Save public key to local storage
-            public_key_file_path = os.path.join(public_key_path, "public_key.pem")
-            self.update_status(f"Saving public key to {public_key_file_path}...")
-            save_public_key(public_key, public_key_path)
-
-            self.status_label.setText("Keys generated and stored successfully!")
-            self.update_status("Keys generated and stored successfully")
-            QMessageBox.information(self, "Success",
-                                    "RSA key pair generated successfully.\n"
-                                    f"Private key stored at: {private_key_file_path}\n"
-                                    f"Public key stored at: {public_key_file_path}")
-
-        except Exception as e:
-            self.status_label.setText(f"Error: {str(e)}")
-            self.update_status(f"Error: {str(e)}")
-            QMessageBox.critical(self, "Error", f"Failed to generate keys: {str(e)}")
+        self.generating = True
+        self.generate_button.setEnabled(False)
+
+        self.keygen_worker = KeyGenerationWorker(pin, self.usb_path, public_key_path)
+        self.keygen_worker.progress.connect(self.on_keygen_progress)
+        self.keygen_worker.keys_generated.connect(self.on_keys_generated)
+        self.keygen_worker.error.connect(self.on_keygen_error)
+        self.keygen_worker.start()
+
+    def on_keygen_progress(self, message):
+        """
+        Show the current key generation step.
+        """
+        self.status_label.setText(message)
+        self.update_status(message)
+
+    def on_keys_generated(self, private_key_file_path, public_key_file_path):
+        """
+        Handle successful key generation.
+        """
+        self.generating = False
+        self.validate_inputs()
+        self.status_label.setText("Keys generated and stored successfully!")
+        self.update_status("Keys generated and stored successfully")
+        QMessageBox.information(self, "Success",
+                                "RSA key pair generated successfully.\n"
+                                f"Private key stored at: {private_key_file_path}\n"
+                                f"Public key stored at: {public_key_file_path}")
+
+    def on_keygen_error(self, message):
+        """
+        Handle key generation failure.
+        """
+        self.generating = False
+        self.validate_inputs()
+        self.status_label.setText(f"Error: {message}")
+        self.update_status(f"Error: {message}")
+        QMessageBox.critical(self, "Error", f"Failed to generate keys: {message}")
 
     def closeEvent(self, event):
         """
-        Stop the USB detector when closing the application.
+        Stop the USB detector and wait for key generation when closing the application.
         """
         self.usb_detector.stop()
+        if self.keygen_worker is not None:
+            self.keygen_worker.wait()
         super().closeEvent(event)
@@ -2,104 +2,105 @@
 USB drive detection module for the key generator application.
 """
 import os
-import time
-import psutil
+import sys
 import platform
 from PyQt5.QtCore import QThread, pyqtSignal
 
+# Drive detection shared with the other application lives in the common
+# package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.drives import MountWatcher, get_removable_drives
+
 class USBDetector(QThread):
     """
     Thread for monitoring USB drive connections and disconnections.
     Automatically detects USB drives for key storage.
     """
     usb_connected = pyqtSignal(str)  # Signal with drive path
-    usb_disconnected = pyqtSignal()
+    usb_disconnected = pyqtSignal(str)  # Signal with drive path
     status_update = pyqtSignal(str)  # Signal for status updates
     
     def __init__(self):
         super().__init__()
         self.running = True
         self.system = platform.system()
+        self.pending_status = []
         self.connected_drives = self.get_removable_drives()
         self.status_update.emit("USB detector initialized")
     
     def run(self):
         """
         Main thread loop for monitoring USB drives.
+        
+        Drives are re-scanned only when the OS reports a mount change
+        (see MountWatcher), or every one to two seconds where no
+        notification source is available.
         """
         # Check for existing drives when monitoring starts
         for drive in self.connected_drives:
-            self.status_update.emit(f"Existing drive detected: {drive}")
+            self.report_status(f"Existing drive detected: {drive}")
             self.usb_connected.emit(drive)
         
-        while self.running:
-            current_drives = self.get_removable_drives()
-            
-            # Check for new drives
-            for drive in current_drives:
-                if drive not in self.connected_drives:
-                    self.status_update.emit(f"New drive detected: {drive}")
+        self.flush_status()
+        
+        watcher = MountWatcher(self.system)
+        try:
+            while self.running:
+                current_drives = self.get_removable_drives()
+                
+                # Check for new drives
+                for drive in current_drives - self.connected_drives:
+                    self.report_status(f"New drive detected: {drive}")
                     self.usb_connected.emit(drive)
-            
-            # Check for removed drives
-            for drive in self.connected_drives:
-                if drive not in current_drives:
-                    self.status_update.emit(f"Drive removed: {drive}")
-                    self.usb_disconnected.emit()
-            
-            self.connected_drives = current_drives
-            time.sleep(1)
+                
+                # Check for removed drives
+                for drive in self.connected_drives - current_drives:
+                    self.report_status(f"Drive removed: {drive}")
+                    self.usb_disconnected.emit(drive)
+                
+                if current_drives != self.connected_drives:
+                    watcher.reset_backoff()
+                self.connected_drives = current_drives
+                self.flush_status()
+                
+                # Wait for the next mount change, waking up every second
+                # to notice a stop request
+                while self.running and not watcher.wait(1):
+                    pass
+        finally:
+            watcher.close()
     
-    def get_removable_drives(self):
+    def report_status(self, message):
         """
-        Get a list of removable drives connected to the system.
+        Queue a status message, sent together with the other messages of
+        the same scan by flush_status.
         
-        On macOS:
-        - Checks volumes in /Volumes directory
-        - Excludes system volumes, Time Machine backups, and non-writable volumes
-        - Verifies mount points and filesystem writability
-        
-        On Windows/Linux:
-        - Uses psutil to detect removable drives and CD-ROMs
-        - Identifies drives based on 'removable' or 'cdrom' mount options
+        Args:
+            message (str): Status message
+        """
+        self.pending_status.append(message)
+    
+    def flush_status(self):
+        """
+        Emit the status messages queued since the last flush as a single update.
+        """
+        if self.pending_status:
+            self.status_update.emit(" | ".join(self.pending_status))
+            self.pending_status.clear()
+    
+    def get_removable_drives(self):
+        """
+        Get the set of removable drives, reporting scan errors as status
+        messages.
         
         Returns:
-            list: List of absolute paths to mounted removable drives
+            set: Set of absolute paths to mounted removable drives
         """
-        drives = []
-        
-        if self.system == "Darwin":  # macOS
-            try:
-                if os.path.exists("/Volumes"):
-                    volumes = os.listdir("/Volumes")
-                    for volume in volumes:
-                        volume_path = os.path.join("/Volumes", volume)
-                        
-                        # Skip if not a mount point
-                        if not os.path.ismount(volume_path):
-                            continue
-                            
-                        # Skip system volumes and Time Machine backups
-                        if any(x in volume for x in ["Macintosh", "System", "Time Machine", "com.apple"]):
-                            continue
-                            
-                        # Get filesystem info
-                        try:
-                            st = os.statvfs(volume_path)
-                            # Check if volume is writable
-                            if (st.f_flag & os.ST_RDONLY) == 0:
-                                drives.append(volume_path)
-                        except:
-                            pass
-            except Exception as e:
-                self.status_update.emit(f"Error detecting drives: {str(e)}")
-        else:
-            # For other systems (Windows/Linux), use psutil
-            for partition in psutil.disk_partitions():
-                if 'removable' in partition.opts or 'cdrom' in partition.opts:
-                    drives.append(partition.mountpoint)
-        
-        return drives
+        try:
+            return get_removable_drives(self.system)
+        except Exception as e:
+            self.report_status(f"Error detecting drives: {str(e)}")
+            return set()
     
     def stop(self):
         """
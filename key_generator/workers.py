@@ -0,0 +1,50 @@
+"""
+Background worker threads for the key generator application.
+"""
+import os
+from PyQt5.QtCore import QThread, pyqtSignal
+from crypto import generate_rsa_keypair, encrypt_private_key, save_public_key
+
+class KeyGenerationWorker(QThread):
+    """
+    Thread generating the RSA key pair and storing both keys.
+    Keeps the GUI responsive while the 4096-bit key is generated.
+    """
+    progress = pyqtSignal(str)  # Signal with the current step description
+    keys_generated = pyqtSignal(str, str)  # Signal with private and public key paths
+    error = pyqtSignal(str)  # Signal with error message
+
+    def __init__(self, pin, usb_path, public_key_dir):
+        super().__init__()
+        self.pin = pin
+        self.usb_path = usb_path
+        self.public_key_dir = public_key_dir
+
+    def run(self):
+        """
+        Generate, encrypt and save the key pair.
+        """
+        try:
+            # Generate RSA key pair
+            self.progress.emit("Generating RSA key pair...")
+            private_key, public_key = generate_rsa_keypair()
+
+            # Encrypt private key with PIN
+            self.progress.emit("Encrypting private key...")
+            encrypted_private_key = encrypt_private_key(private_key, self.pin)
+
+            # Save private key to USB drive
+            private_key_file_path = os.path.join(self.usb_path, "private_key.enc")
+            self.progress.emit(f"Saving private key to {private_key_file_path}...")
+            with open(private_key_file_path, 'wb') as f:
+                f.write(encrypted_private_key)
+
+            # Save public key to local storage
+            public_key_file_path = os.path.join(self.public_key_dir, "public_key.pem")
+            self.progress.emit(f"Saving public key to {public_key_file_path}...")
+            save_public_key(public_key, self.public_key_dir)
+
+            self.keys_generated.emit(private_key_file_path, public_key_file_path)
+
+        except Exception as e:
+            self.error.emit(str(e))
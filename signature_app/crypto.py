@@ -2,9 +2,30 @@
 Cryptographic functions for the signature application.
 """
 import hashlib
-from cryptography.hazmat.primitives.asymmetric import padding
+import logging
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.asymmetric import padding, utils
 from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+logger = logging.getLogger(__name__)
+
+# Encrypted private key file format marker written by the key generator
+KEY_FILE_MAGIC = b"ESK2"
+
+# scrypt cost parameters, must match the key generator
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_MAXMEM = 64 * 1024 * 1024
+
+# Signature scheme: RSA-PSS over a SHA-256 digest computed by the caller.
+# The objects are immutable, so one instance serves every signature.
+SIGNATURE_PADDING = padding.PSS(
+    mgf=padding.MGF1(hashes.SHA256()),
+    salt_length=padding.PSS.MAX_LENGTH
+)
+SIGNATURE_HASH = utils.Prehashed(hashes.SHA256())
 
 def derive_key_from_pin(pin, salt):
     """
@@ -17,93 +38,116 @@ def derive_key_from_pin(pin, salt):
     Returns:
         bytes: Derived key
     """
-    # Use PBKDF2 to derive a key from the PIN
-    key = hashlib.pbkdf2_hmac('sha256', pin.encode(), salt, 100000, 32)
+    # Use scrypt to derive a key from the PIN
+    key = hashlib.scrypt(pin.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R,
+                         p=SCRYPT_P, maxmem=SCRYPT_MAXMEM, dklen=32)
     return key
 
 def decrypt_private_key(encrypted_data, pin) -> bytes:
     """
-    Decrypt the private key using AES-256 with a key derived from the PIN.
+    Decrypt the private key using AES-256-GCM with a key derived from the PIN.
     
     Args:
-        encrypted_data (bytes): Encrypted private key with salt and IV prepended
+        encrypted_data (bytes): Encrypted private key with format marker, salt
+            and nonce prepended and the authentication tag appended
         pin (str): User PIN
         
     Returns:
         bytes: Decrypted private key in PEM format
+        
+    Raises:
+        ValueError: If the key file was not written in the current format
+            or the PIN is wrong
     """
-    # Extract salt, IV, and encrypted key
-    salt = encrypted_data[:16]
-    iv = encrypted_data[16:32]
-    encrypted_key = encrypted_data[32:]
+    if not encrypted_data.startswith(KEY_FILE_MAGIC):
+        raise ValueError("Unsupported private key file format. "
+                         "Please generate a new key pair with the key generator.")
+    
+    # Extract salt, nonce, and encrypted key with its authentication tag
+    offset = len(KEY_FILE_MAGIC)
+    salt = encrypted_data[offset:offset + 16]
+    nonce = encrypted_data[offset + 16:offset + 28]
+    encrypted_key = encrypted_data[offset + 28:]
     
     # Derive key from PIN
     key = derive_key_from_pin(pin, salt)
     
-    # Create AES cipher
-    cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
-    decryptor = cipher.decryptor()
-    
-    # Decrypt the private key
-    padded_data = decryptor.update(encrypted_key) + decryptor.finalize()
-    
-    # Remove padding
-    padding_length = padded_data[-1]
-    private_key_pem = padded_data[:-padding_length]
+    # Decrypt and authenticate the private key in a single AES-GCM call.
+    # A wrong PIN yields a wrong key, which OpenSSL detects with a
+    # constant-time comparison of the authentication tag.
+    try:
+        private_key_pem = AESGCM(key).decrypt(nonce, encrypted_key, None)
+    except InvalidTag:
+        raise ValueError("Invalid PIN")
     
     return private_key_pem
 
-def sign_data(data, private_key_pem):
+def load_private_key(private_key_pem):
     """
-    Sign data using the private key.
+    Load a PEM-encoded private key.
+    
+    The loaded key can be reused to sign any number of documents without
+    parsing the PEM data again.
     
     Args:
-        data (bytes): Data to sign
         private_key_pem (bytes): PEM-encoded private key
         
     Returns:
-        bytes: Signature
+        RSAPrivateKey: Loaded private key
     """
-    print(f"Signing data with private key...")
-    print(f"Data to sign (hash) length: {len(data)} bytes")
-    print(f"Data to sign (hash): {data.hex()}")
-    
-    # Load private key
     try:
         private_key = serialization.load_pem_private_key(
             private_key_pem,
             password=None
         )
-        print(f"Successfully loaded private key: {private_key}")
+        logger.debug("Successfully loaded private key: %s", private_key)
+        return private_key
     except Exception as e:
-        print(f"ERROR loading private key: {str(e)}")
+        logger.error("ERROR loading private key: %s", e)
         raise
+
+def sign_data(data, private_key):
+    """
+    Sign a SHA-256 digest using the private key.
+    
+    The digest is signed as-is (prehashed), so the document is hashed
+    only once, by the caller.
+    
+    Args:
+        data (bytes): SHA-256 digest to sign
+        private_key (RSAPrivateKey): Private key returned by load_private_key
+        
+    Returns:
+        bytes: Signature
+    """
+    # Hex strings are only built when debug logging is enabled
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Signing data with private key...")
+        logger.debug("Data to sign (hash) length: %d bytes", len(data))
+        logger.debug("Data to sign (hash): %s", data.hex())
     
     try:
         # Sign the data
-        print("Signing with PSS padding, SHA256 hash...")
         signature = private_key.sign(
             data,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
+            SIGNATURE_PADDING,
+            SIGNATURE_HASH
         )
         
-        print(f"Signature created successfully, length: {len(signature)} bytes")
-        print(f"Signature: {signature.hex()[:64]}...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Signature created successfully, length: %d bytes", len(signature))
+            logger.debug("Signature: %s...", signature.hex()[:64])
         return signature
     except Exception as e:
-        print(f"ERROR during signing: {str(e)}")
+        logger.error("ERROR during signing: %s", e)
         raise
 
 def verify_signature(data, signature, public_key_pem):
     """
-    Verify a signature using the public key.
+    Verify a signature over a SHA-256 digest using the public key.
     
     Args:
-        data (bytes): Original data
+        data (bytes): SHA-256 digest that was signed
         signature (bytes): Signature to verify
         public_key_pem (bytes): PEM-encoded public key
         
@@ -113,28 +157,26 @@ def verify_signature(data, signature, public_key_pem):
     # Load public key
     try:
         public_key = serialization.load_pem_public_key(public_key_pem)
-        print(f"Loaded public key: {public_key}")
+        logger.debug("Loaded public key: %s", public_key)
     except Exception as e:
-        print(f"ERROR loading public key in verify_signature: {str(e)}")
+        logger.error("ERROR loading public key in verify_signature: %s", e)
         return False
     
     try:
         # Verify the signature
-        print(f"Verifying signature with PSS padding, SHA256 hash")
-        print(f"Data to verify (hash): {data.hex()[:32]}...")
-        print(f"Signature to verify: {signature.hex()[:32]}...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Verifying signature with PSS padding, prehashed SHA256 digest")
+            logger.debug("Data to verify (hash): %s...", data.hex()[:32])
+            logger.debug("Signature to verify: %s...", signature.hex()[:32])
         
         public_key.verify(
             signature,
             data,
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
+            SIGNATURE_PADDING,
+            SIGNATURE_HASH
         )
-        print("Signature verification SUCCEEDED!")
+        logger.debug("Signature verification SUCCEEDED!")
         return True
     except Exception as e:
-        print(f"Signature verification FAILED: {str(e)}")
+        logger.debug("Signature verification FAILED: %r", e)
         return False 
\ No newline at end of file
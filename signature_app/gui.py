@@ -4,11 +4,16 @@ GUI implementation for the PAdES signature application.
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QPushButton, QLabel, QLineEdit, QFileDialog, 
                             QTabWidget, QMessageBox, QProgressBar)
-from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtGui import QIcon
-from pdf_handler import sign_pdf, verify_pdf_signature
-from crypto import decrypt_private_key
+from PyQt5.QtCore import Qt, QTimer, QSettings
+import hashlib
+import hmac
 import os
+from pathlib import Path
+
+# Per-process key of the tag stored with a loaded private key. An
+# unkeyed tag would let anyone who obtains it test every PIN with one
+# BLAKE2b call each instead of a scrypt derivation.
+KEY_TAG_SECRET = os.urandom(32)
 
 class SignatureAppWindow(QMainWindow):
     """
@@ -57,8 +62,16 @@ class SignatureAppWindow(QMainWindow):
         
         # Initialize state
         self.private_key = None
+        self.private_key_tag = None
         self.current_usb_path = None
         self.encrypted_key_data = None
+        self.signing_worker = None
+        self.signing_key_tag = None
+        self.signing = False
+        self.verification_worker = None
+        
+        # Last directory of each file dialog, kept between sessions
+        self.settings = QSettings("PAdES", "SignatureApp")
     
     def handle_usb_connected(self, usb_path, encrypted_key_data):
         """
@@ -70,6 +83,8 @@ class SignatureAppWindow(QMainWindow):
         """
         self.current_usb_path = usb_path
         self.encrypted_key_data = encrypted_key_data
+        self.private_key = None
+        self.private_key_tag = None
         self.usb_status.setText(f"USB Status: Key detected on {usb_path}")
         self.usb_status.setStyleSheet("color: green;")
         
@@ -81,19 +96,27 @@ class SignatureAppWindow(QMainWindow):
         QMessageBox.information(self, "USB Key Detected", 
                               "Private key detected on USB drive. Please enter your PIN to use it.")
     
-    def handle_usb_disconnected(self):
+    def handle_usb_disconnected(self, usb_path):
         """
         Handle USB drive disconnection.
+        
+        Args:
+            usb_path (str): Path to the removed drive
         """
+        # Ignore drives other than the one holding the private key
+        if usb_path != self.current_usb_path:
+            return
+        
         self.current_usb_path = None
         self.encrypted_key_data = None
         self.usb_status.setText("USB Status: No USB with key detected")
         self.usb_status.setStyleSheet("color: red;")
         self.private_key = None
+        self.private_key_tag = None
         self.key_status.setText("Key Status: Not Loaded")
         
-        # Clear private key path if it was from USB
-        if self.private_key_path.text().startswith("/Volumes/"):  # macOS USB path
+        # Clear private key path if it was on the removed drive
+        if self.private_key_path.text().startswith(os.path.join(usb_path, "")):
             self.private_key_path.clear()
         
         QMessageBox.warning(self, "USB Disconnected", 
@@ -116,10 +139,17 @@ class SignatureAppWindow(QMainWindow):
         """
         layout = QVBoxLayout(self.sign_tab)
         
+        # Update the sign button once typing pauses instead of on every keystroke
+        self.sign_button_timer = QTimer(self)
+        self.sign_button_timer.setSingleShot(True)
+        self.sign_button_timer.setInterval(100)
+        self.sign_button_timer.timeout.connect(self.update_sign_button)
+        
         # PDF selection
         self.pdf_label = QLabel("Select PDF to sign:")
         self.pdf_path = QLineEdit()
         self.pdf_path.setReadOnly(True)
+        self.pdf_path.textChanged.connect(lambda: self.sign_button_timer.start())
         self.pdf_browse = QPushButton("Browse")
         self.pdf_browse.clicked.connect(self.browse_pdf)
         
@@ -136,12 +166,13 @@ class SignatureAppWindow(QMainWindow):
         self.pin_label = QLabel("Enter PIN:")
         self.pin_input = QLineEdit()
         self.pin_input.setEchoMode(QLineEdit.Password)
-        self.pin_input.textChanged.connect(self.handle_pin_input)
+        self.pin_input.textChanged.connect(lambda: self.sign_button_timer.start())
         
         # Output PDF location
         self.output_label = QLabel("Save signed PDF as:")
         self.output_path = QLineEdit()
         self.output_path.setReadOnly(True)
+        self.output_path.textChanged.connect(lambda: self.sign_button_timer.start())
         self.output_browse = QPushButton("Browse")
         self.output_browse.clicked.connect(self.browse_output)
         
@@ -171,11 +202,12 @@ class SignatureAppWindow(QMainWindow):
         layout.addWidget(self.progress_bar)
         layout.addStretch()
     
-    def handle_pin_input(self):
+    def update_sign_button(self):
         """
-        Handle PIN input changes.
+        Enable the sign button when a PDF, an output path and a PIN are given.
         """
-        if self.pin_input.text() and self.pdf_path.text() and self.output_path.text():
+        if (self.pin_input.text() and self.pdf_path.text() and self.output_path.text()
+                and not self.signing):
             self.sign_button.setEnabled(True)
         else:
             self.sign_button.setEnabled(False)
@@ -184,6 +216,10 @@ class SignatureAppWindow(QMainWindow):
         """
         Sign the selected PDF document.
         """
+        # Ignore clicks queued while a document is being signed
+        if self.signing:
+            return
+        
         pdf_path = self.pdf_path.text()
         output_path = self.output_path.text()
         pin = self.pin_input.text()
@@ -208,36 +244,85 @@ class SignatureAppWindow(QMainWindow):
                                "Please reconnect it to sign the document.")
             return
         
-        try:
-            # Show progress
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setValue(10)
-            
-            # Decrypt the private key
-            private_key = decrypt_private_key(self.encrypted_key_data, pin)
+        # Reuse the private key if it was already loaded from the same key
+        # file with the same PIN
+        key_tag = hashlib.blake2b(self.encrypted_key_data + pin.encode(),
+                                  key=KEY_TAG_SECRET, digest_size=16).digest()
+        private_key = None
+        if self.private_key_tag is not None and hmac.compare_digest(key_tag, self.private_key_tag):
+            private_key = self.private_key
+        
+        # Do not keep the PIN in the input field, whether or not the key
+        # has to be decrypted again
+        self.pin_input.clear()
+        if private_key is not None:
             self.key_status.setText("Key Status: Loaded")
             self.key_status.setStyleSheet("color: green;")
-            
-            self.progress_bar.setValue(30)
-            
-            # Sign the PDF
-            sign_pdf(pdf_path, output_path, private_key)
-            
-            self.progress_bar.setValue(100)
-            
-            # Hide progress bar after a delay
-            QTimer.singleShot(1000, lambda: self.progress_bar.setVisible(False))
-            
-            QMessageBox.information(self, "Success", "Document signed successfully!")
-            
-        except Exception as e:
-            self.progress_bar.setVisible(False)
-            error_msg = str(e)
-            if "Invalid PIN" in error_msg:
-                QMessageBox.critical(self, "Invalid PIN", 
-                                   "The PIN you entered is incorrect. Please try again.")
-            else:
-                QMessageBox.critical(self, "Error", f"Failed to sign document: {error_msg}")
+        
+        # Show progress
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(10)
+        
+        self.signing = True
+        self.sign_button.setEnabled(False)
+        
+        # Sign in a background thread so the window stays responsive
+        from workers import SigningWorker
+        self.signing_key_tag = key_tag
+        self.signing_worker = SigningWorker(pdf_path, output_path, private_key,
+                                            self.encrypted_key_data, pin)
+        self.signing_worker.progress.connect(self.progress_bar.setValue)
+        self.signing_worker.key_loaded.connect(self.handle_key_loaded)
+        self.signing_worker.document_signed.connect(self.handle_document_signed)
+        self.signing_worker.error.connect(self.handle_signing_error)
+        self.signing_worker.start()
+    
+    def handle_key_loaded(self, private_key):
+        """
+        Keep the private key loaded by the signing worker for later signatures.
+        
+        Args:
+            private_key (RSAPrivateKey): Loaded private key
+        """
+        # Drop the key if its USB drive was removed while signing
+        if self.signing_worker.encrypted_key_data is not self.encrypted_key_data:
+            return
+        
+        self.private_key = private_key
+        self.private_key_tag = self.signing_key_tag
+        self.key_status.setText("Key Status: Loaded")
+        self.key_status.setStyleSheet("color: green;")
+    
+    def handle_document_signed(self, output_path):
+        """
+        Handle successful signing.
+        
+        Args:
+            output_path (str): Path to the signed PDF
+        """
+        self.signing = False
+        self.update_sign_button()
+        
+        # Hide progress bar after a delay
+        QTimer.singleShot(1000, lambda: self.progress_bar.setVisible(False))
+        
+        QMessageBox.information(self, "Success", "Document signed successfully!")
+    
+    def handle_signing_error(self, error_msg):
+        """
+        Handle signing failure.
+        
+        Args:
+            error_msg (str): Error message
+        """
+        self.signing = False
+        self.update_sign_button()
+        self.progress_bar.setVisible(False)
+        if "Invalid PIN" in error_msg:
+            QMessageBox.critical(self, "Invalid PIN", 
+                               "The PIN you entered is incorrect. Please try again.")
+        else:
+            QMessageBox.critical(self, "Error", f"Failed to sign document: {error_msg}")
     
     def setup_verify_tab(self):
         """
@@ -288,19 +373,24 @@ class SignatureAppWindow(QMainWindow):
         """
         Open file dialog to select PDF document to sign.
         """
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select PDF Document", "", "PDF Files (*.pdf)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select PDF Document",
+                                                   self.last_directory("pdf"), "PDF Files (*.pdf)")
         if file_path:
+            self.remember_directory("pdf", file_path)
             self.pdf_path.setText(file_path)
             # Auto-suggest output path
-            suggested_output = file_path.replace(".pdf", "_signed.pdf")
-            self.output_path.setText(suggested_output)
+            pdf_file = Path(file_path)
+            suggested_output = pdf_file.with_name(pdf_file.stem + "_signed" + pdf_file.suffix)
+            self.output_path.setText(str(suggested_output))
     
     def browse_output(self):
         """
         Open file dialog to select output location for signed PDF.
         """
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Signed PDF As", "", "PDF Files (*.pdf)")
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Signed PDF As",
+                                                   self.last_directory("output"), "PDF Files (*.pdf)")
         if file_path:
+            self.remember_directory("output", file_path)
             if not file_path.endswith(".pdf"):
                 file_path += ".pdf"
             self.output_path.setText(file_path)
@@ -309,8 +399,10 @@ class SignatureAppWindow(QMainWindow):
         """
         Open file dialog to select signed PDF document to verify.
         """
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select Signed PDF Document", "", "PDF Files (*.pdf)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Signed PDF Document",
+                                                   self.last_directory("signed_pdf"), "PDF Files (*.pdf)")
         if file_path:
+            self.remember_directory("signed_pdf", file_path)
             self.signed_pdf_path.setText(file_path)
             self.verification_result.setText("")
     
@@ -318,11 +410,35 @@ class SignatureAppWindow(QMainWindow):
         """
         Open file dialog to select public key file.
         """
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select Public Key File", "", "PEM Files (*.pem)")
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Public Key File",
+                                                   self.last_directory("public_key"), "PEM Files (*.pem)")
         if file_path:
+            self.remember_directory("public_key", file_path)
             self.public_key_path.setText(file_path)
             self.verification_result.setText("")
     
+    def last_directory(self, role):
+        """
+        Get the directory last used by a file dialog.
+        
+        Args:
+            role (str): Name of the file dialog
+            
+        Returns:
+            str: Directory path, or an empty string if the dialog was never used
+        """
+        return self.settings.value(f"last_directory/{role}", "", type=str)
+    
+    def remember_directory(self, role, file_path):
+        """
+        Store the directory of a file selected in a file dialog.
+        
+        Args:
+            role (str): Name of the file dialog
+            file_path (str): Selected file path
+        """
+        self.settings.setValue(f"last_directory/{role}", os.path.dirname(file_path))
+    
     def verify_signature(self):
         """
         Verify the signature of the selected PDF document.
@@ -339,37 +455,73 @@ class SignatureAppWindow(QMainWindow):
             QMessageBox.warning(self, "No Public Key", "Please select the public key file.")
             return
         
-        try:
-            # Load public key
-            with open(public_key_path, 'rb') as f:
-                public_key_data = f.read()
-            
-            # Verify the signature
-            try:
-                is_valid = verify_pdf_signature(pdf_path, public_key_data)
-                
-                if is_valid:
-                    self.verification_result.setText("✅ Signature is valid!")
-                    self.verification_result.setStyleSheet("color: green; font-weight: bold;")
-                else:
-                    self.verification_result.setText("❌ Signature is invalid!")
-                    self.verification_result.setStyleSheet("color: red; font-weight: bold;")
-                    QMessageBox.warning(self, "Invalid Signature", 
-                                       "The signature could not be verified. This might be because:\n\n"
-                                       "1. The document was modified after signing\n"
-                                       "2. The public key doesn't match the private key used to sign\n"
-                                       "3. The signature was corrupted or improperly embedded")
-            except ValueError as ve:
-                self.verification_result.setText(f"❌ Verification Error: {str(ve)}")
-                self.verification_result.setStyleSheet("color: red; font-weight: bold;")
-                QMessageBox.critical(self, "Verification Error", 
-                                    f"Error during verification: {str(ve)}\n\n"
-                                    "Make sure you're using the correct public key that corresponds "
-                                    "to the private key used for signing.")
-            
-        except Exception as e:
-            self.verification_result.setText(f"Error: {str(e)}")
-            self.verification_result.setStyleSheet("color: red;")
-            QMessageBox.critical(self, "File Error", 
-                               f"Error reading files: {str(e)}\n\n"
-                               "Make sure the public key file is in the correct PEM format.") 
\ No newline at end of file
+        self.verify_button.setEnabled(False)
+        self.verification_result.setText("Verifying...")
+        self.verification_result.setStyleSheet("")
+        
+        # Verify in a background thread so the window stays responsive
+        from workers import VerificationWorker
+        self.verification_worker = VerificationWorker(pdf_path, public_key_path)
+        self.verification_worker.verified.connect(self.handle_verification_result)
+        self.verification_worker.verification_error.connect(self.handle_verification_error)
+        self.verification_worker.error.connect(self.handle_verification_file_error)
+        self.verification_worker.start()
+    
+    def handle_verification_result(self, is_valid):
+        """
+        Show the result of a completed verification.
+        
+        Args:
+            is_valid (bool): True if the signature is valid
+        """
+        self.verify_button.setEnabled(True)
+        if is_valid:
+            self.verification_result.setText("✅ Signature is valid!")
+            self.verification_result.setStyleSheet("color: green; font-weight: bold;")
+        else:
+            self.verification_result.setText("❌ Signature is invalid!")
+            self.verification_result.setStyleSheet("color: red; font-weight: bold;")
+            QMessageBox.warning(self, "Invalid Signature", 
+                               "The signature could not be verified. This might be because:\n\n"
+                               "1. The document was modified after signing\n"
+                               "2. The public key doesn't match the private key used to sign\n"
+                               "3. The signature was corrupted or improperly embedded")
+    
+    def handle_verification_error(self, error_msg):
+        """
+        Handle an error raised while verifying the signature.
+        
+        Args:
+            error_msg (str): Error message
+        """
+        self.verify_button.setEnabled(True)
+        self.verification_result.setText(f"❌ Verification Error: {error_msg}")
+        self.verification_result.setStyleSheet("color: red; font-weight: bold;")
+        QMessageBox.critical(self, "Verification Error", 
+                            f"Error during verification: {error_msg}\n\n"
+                            "Make sure you're using the correct public key that corresponds "
+                            "to the private key used for signing.")
+    
+    def handle_verification_file_error(self, error_msg):
+        """
+        Handle an error reading the signed PDF or the public key.
+        
+        Args:
+            error_msg (str): Error message
+        """
+        self.verify_button.setEnabled(True)
+        self.verification_result.setText(f"Error: {error_msg}")
+        self.verification_result.setStyleSheet("color: red;")
+        QMessageBox.critical(self, "File Error", 
+                           f"Error reading files: {error_msg}\n\n"
+                           "Make sure the public key file is in the correct PEM format.")
+    
+    def closeEvent(self, event):
+        """
+        Wait for a running signature or verification before closing the application.
+        """
+        if self.signing_worker is not None:
+            self.signing_worker.wait()
+        if self.verification_worker is not None:
+            self.verification_worker.wait()
+        super().closeEvent(event)
\ No newline at end of file
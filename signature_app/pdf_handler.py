@@ -3,110 +3,285 @@ PDF handling module for signing and verifying PDF documents.
 """
 import io
 import hashlib
+import logging
+import mmap
 import os
-from PyPDF2 import PdfReader, PdfWriter
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (ArrayObject, ByteStringObject, DictionaryObject,
+                            IndirectObject, NameObject, NumberObject,
+                            TextStringObject, create_string_object)
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from crypto import sign_data, verify_signature
 
-def sign_pdf(input_path, output_path, private_key_pem):
+logger = logging.getLogger(__name__)
+
+# Space reserved for the /ByteRange array, filled in once the offsets of
+# the signature placeholder are known
+BYTE_RANGE_WIDTH = 48
+
+# Start of an indirect object and its /Type /XRef entry, to tell a
+# cross-reference stream from a cross-reference table
+XREF_STREAM_HEADER_PATTERN = re.compile(rb"\s*\d+\s+\d+\s+obj\b")
+XREF_TYPE_PATTERN = re.compile(rb"/Type\s*/XRef\b")
+
+# Signature value stored between the two signed byte ranges
+SIGNATURE_VALUE_PATTERN = re.compile(rb"<([0-9a-fA-F]+)>")
+
+def sign_pdf(input_path, output_path, private_key):
     """
     Sign a PDF document and embed the signature.
     
     Args:
         input_path (str): Path to the input PDF
         output_path (str): Path to save the signed PDF
-        private_key_pem (bytes): PEM-encoded private key
+        private_key (RSAPrivateKey): Private key returned by load_private_key
     """
-    print("\n=== DETAILED PDF SIGNING DEBUGGING ===")
-    print(f"Input PDF: {input_path}")
-    print(f"Output PDF: {output_path}")
+    logger.debug("Signing %s into %s", input_path, output_path)
+    
+    if os.path.abspath(input_path) == os.path.abspath(output_path):
+        raise ValueError("The signed PDF must be saved to a different file than the original.")
     
     try:
-        # Read the PDF and calculate initial hash
-        with open(input_path, 'rb') as f:
-            pdf_content = f.read()
-            initial_hash = hashlib.sha256(pdf_content).digest()
-        
-        # Read the PDF for processing
-        with open(input_path, 'rb') as f:
+        # Map the PDF once and use the mapping for both hashing and parsing
+        with open(input_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as pdf_content:
+            # Calculate initial hash straight from the page cache, without
+            # copying the whole file into a Python bytes object
+            pdf_hash = hashlib.sha256(pdf_content)
+            initial_hash = pdf_hash.digest()
+            
             try:
-                pdf_reader = PdfReader(f)
+                pdf_reader = PdfReader(pdf_content)
             except Exception as e:
-                print(f"Error reading PDF: {str(e)}")
+                logger.error("Error reading PDF: %s", e)
                 raise ValueError("The PDF file appears to be corrupted or invalid. Please try with a different PDF file.")
             
-            pdf_writer = PdfWriter()
-            
-            print(f"Original PDF has {len(pdf_reader.pages)} pages")
-            
-            # Copy all pages from the original PDF
-            for page_num in range(len(pdf_reader.pages)):
-                try:
-                    page = pdf_reader.pages[page_num]
-                    pdf_writer.add_page(page)
-                except Exception as e:
-                    print(f"Error processing page {page_num + 1}: {str(e)}")
-                    raise ValueError(f"Error processing page {page_num + 1}. The PDF may be corrupted.")
+            # The original bytes are written to the signed PDF unchanged, so
+            # hashing them covers every page without rebuilding them.
+            # Loading the page tree and hex strings are only needed for
+            # debug output.
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Original PDF has %d pages", len(pdf_reader.pages))
+                logger.debug("Signing - PDF hash: %s", initial_hash.hex())
             
-            # Calculate hash of the PDF content
-            pdf_hash = hashlib.sha256()
-            print("Calculating document hash for signing...")
-            
-            # Create a buffer with the PDF content
-            pdf_buffer = io.BytesIO()
-            pdf_writer.write(pdf_buffer)
-            pdf_content_to_hash = pdf_buffer.getvalue()
-            
-            # Hash the PDF content
-            pdf_hash.update(pdf_content_to_hash)
-            print(f"PDF content length: {len(pdf_content_to_hash)} bytes")
-            
-            # Add the initial hash to the content hash
-            pdf_hash.update(initial_hash)
-            
-            print(f"DEBUG: Signing - PDF hash: {pdf_hash.hexdigest()}")
-            print(f"Hash bytes length: {len(pdf_hash.digest())} bytes")
-            
-            # Sign the hash
-            print("\nGenerating signature...")
-            signature = sign_data(pdf_hash.digest(), private_key_pem)
-            print(f"Signature bytes length: {len(signature)} bytes")
-            print(f"Signature hex: {signature.hex()[:64]}...")
-            
-            # Add metadata
-            print("\nAdding document metadata...")
+            # Add metadata, keeping all entries of the original document
+            original_info = pdf_reader.metadata
             metadata = {
                 '/PAdES-Signature': 'True',
                 '/SignatureDate': f"{os.path.basename(input_path)}",
                 '/SignatureType': 'RSA-SHA256',
-                '/Signature': signature.hex(),  # Store signature in metadata
-                '/InitialHash': initial_hash.hex(),  # Store initial hash in metadata
-                '/Title': pdf_reader.metadata.get('/Title', '') + ' (Digitally Signed)',
-                '/Author': pdf_reader.metadata.get('/Author', ''),
-                '/Subject': pdf_reader.metadata.get('/Subject', ''),
-                '/Keywords': pdf_reader.metadata.get('/Keywords', ''),
-                '/Creator': pdf_reader.metadata.get('/Creator', ''),
-                '/Producer': pdf_reader.metadata.get('/Producer', ''),
-                '/CreationDate': pdf_reader.metadata.get('/CreationDate', ''),
-                '/ModDate': pdf_reader.metadata.get('/ModDate', '')
+                '/Title': ((original_info.title if original_info else None) or '') + ' (Digitally Signed)',
             }
-            pdf_writer.add_metadata(metadata)
-            print(f"Added metadata keys: {list(metadata.keys())}")
+            pdf_info = DictionaryObject(original_info.items() if original_info else ())
+            for key, value in metadata.items():
+                pdf_info[NameObject(key)] = create_string_object(value)
+            # The signature entries of an already signed document are
+            # replaced by the new ones
+            for key in ('/ByteRange', '/Signature'):
+                pdf_info.pop(key, None)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Metadata keys: %s", list(pdf_info.keys()))
+            
+            # The signature covers the whole signed PDF except the
+            # signature value itself: the original bytes and the
+            # incremental update around the /Signature placeholder
+            signature_size = (private_key.key_size + 7) // 8
+            update, signature_start, signature_end = build_incremental_update(
+                pdf_content, pdf_reader, pdf_info, signature_size)
+            pdf_hash.update(update[:signature_start])
+            pdf_hash.update(update[signature_end:])
+            
+            # Sign the hash
+            signature = sign_data(pdf_hash.digest(), private_key)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Signature bytes length: %d bytes", len(signature))
+                logger.debug("Signature hex: %s...", signature.hex()[:64])
+            
+            # Store the signature as a hex string in the placeholder
+            update[signature_start + 1:signature_end - 1] = signature.hex().encode()
             
-            # Save the signed PDF
-            print(f"\nSaving signed PDF to {output_path}...")
+            # Save the signed PDF: the original bytes are copied unchanged
+            # (shutil lets the OS copy them without passing through Python)
+            # and the new metadata is appended as an incremental update
             try:
-                with open(output_path, 'wb') as output_file:
-                    pdf_writer.write(output_file)
-                print("PDF signed successfully")
+                shutil.copyfile(input_path, output_path)
+                with open(output_path, 'ab') as output_file:
+                    output_file.write(update)
+                logger.info("Signed %s into %s", input_path, output_path)
             except Exception as e:
-                print(f"Error saving signed PDF: {str(e)}")
+                logger.error("Error saving signed PDF: %s", e)
                 raise ValueError("Error saving the signed PDF. Please check if you have write permissions to the output location.")
     except Exception as e:
-        print(f"Error during PDF signing process: {str(e)}")
+        logger.error("Error during PDF signing process: %s", e)
         raise ValueError(f"Failed to sign document: {str(e)}")
 
+def sign_pdfs(jobs, private_key):
+    """
+    Sign several PDF documents with the same private key.
+    
+    The key is loaded once by the caller and shared by all documents.
+    Documents are signed in a thread pool, so the hashing and RSA work,
+    which run without holding the GIL, overlap across files.
+    
+    Args:
+        jobs (list): List of (input_path, output_path) tuples
+        private_key (RSAPrivateKey): Private key returned by load_private_key
+    """
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(lambda job: sign_pdf(job[0], job[1], private_key), jobs))
+
+def find_startxref(pdf_content):
+    """
+    Find the offset of the last cross-reference section of a PDF.
+    
+    Args:
+        pdf_content (bytes-like): PDF file content
+        
+    Returns:
+        int: Offset stored after the last startxref keyword
+    """
+    position = pdf_content.rfind(b"startxref")
+    if position == -1:
+        raise ValueError("The PDF file has no cross-reference table")
+    return int(pdf_content[position + 9:position + 40].split()[0])
+
+def is_xref_stream(pdf_content, offset):
+    """
+    Check if the cross-reference data at an offset is a cross-reference stream.
+    
+    Args:
+        pdf_content (bytes-like): PDF file content
+        offset (int): Offset of the cross-reference data
+        
+    Returns:
+        bool: True for a /Type /XRef stream object, False for a
+            cross-reference table
+    """
+    header = bytes(pdf_content[offset:offset + 1024])
+    if XREF_STREAM_HEADER_PATTERN.match(header) is None:
+        return False
+    return XREF_TYPE_PATTERN.search(header.split(b"stream", 1)[0]) is not None
+
+def build_incremental_update(pdf_content, pdf_reader, pdf_info, signature_size):
+    """
+    Build an incremental update that replaces the document information dictionary.
+    
+    Only the new information dictionary, cross-reference data for it and
+    a trailer pointing back to the original cross-reference data are
+    written; the original document bytes stay untouched. The
+    cross-reference data is a stream if the original document ends with
+    one, and a table otherwise. The dictionary
+    ends with a /ByteRange entry and a zero-filled /Signature hex string
+    placeholder. /ByteRange covers the whole signed PDF except the
+    placeholder.
+    
+    Args:
+        pdf_content (bytes-like): Original PDF file content
+        pdf_reader (PdfReader): Reader of the original PDF
+        pdf_info (DictionaryObject): New document information dictionary
+        signature_size (int): Size of the signature in bytes
+        
+    Returns:
+        tuple: (bytearray with the update, offset of the placeholder,
+            offset right after the placeholder), offsets relative to the update
+    """
+    if pdf_reader.is_encrypted:
+        raise ValueError("Encrypted PDF documents are not supported")
+    
+    start = len(pdf_content)
+    update = io.BytesIO()
+    
+    # Start the update on a new line
+    if pdf_content[-1:] not in (b"\n", b"\r"):
+        update.write(b"\n")
+    
+    # New information dictionary gets the next free object number. Documents
+    # using cross-reference streams do not expose /Size in the trailer, so
+    # also look at the highest object number actually in use.
+    object_numbers = [num for entries in pdf_reader.xref.values() for num in entries]
+    object_numbers.extend(pdf_reader.xref_objStm)
+    info_number = max(int(pdf_reader.trailer.get('/Size', 0)), max(object_numbers, default=0) + 1)
+    info_offset = start + update.tell()
+    update.write(f"{info_number} 0 obj\n".encode())
+    info = io.BytesIO()
+    pdf_info.write_to_stream(info, None)
+    # Leave the dictionary open to append the signature entries
+    update.write(info.getbuffer()[:-2])
+    update.write(b"/ByteRange ")
+    byte_range_offset = update.tell()
+    update.write(b" " * BYTE_RANGE_WIDTH + b"\n/Signature ")
+    signature_start = update.tell()
+    update.write(b"<" + b"0" * (2 * signature_size) + b">")
+    signature_end = update.tell()
+    update.write(b"\n>>\nendobj\n")
+    
+    # Trailer chained to the previous cross-reference section
+    previous_xref = find_startxref(pdf_content)
+    xref_offset = start + update.tell()
+    trailer = DictionaryObject({
+        NameObject('/Size'): NumberObject(info_number + 1),
+        NameObject('/Root'): pdf_reader.trailer.raw_get('/Root'),
+        NameObject('/Info'): IndirectObject(info_number, 0, pdf_reader),
+        NameObject('/Prev'): NumberObject(previous_xref),
+    })
+    if '/ID' in pdf_reader.trailer:
+        trailer[NameObject('/ID')] = ArrayObject(
+            ByteStringObject(string_object_bytes(file_id)) for file_id in pdf_reader.trailer['/ID'])
+    
+    # Some readers reject or repair a cross-reference table chained to a
+    # cross-reference stream, so keep the kind the original document uses
+    if is_xref_stream(pdf_content, previous_xref):
+        # Cross-reference stream listing the new information dictionary
+        # and the stream itself, with the trailer entries in its dictionary
+        xref_number = info_number + 1
+        offset_size = max(4, (xref_offset.bit_length() + 7) // 8)
+        entries = b"".join(b"\x01" + offset.to_bytes(offset_size, "big") + b"\x00\x00"
+                           for offset in (info_offset, xref_offset))
+        trailer[NameObject('/Type')] = NameObject('/XRef')
+        trailer[NameObject('/Size')] = NumberObject(xref_number + 1)
+        trailer[NameObject('/Index')] = ArrayObject([NumberObject(info_number), NumberObject(2)])
+        trailer[NameObject('/W')] = ArrayObject(
+            [NumberObject(1), NumberObject(offset_size), NumberObject(2)])
+        trailer[NameObject('/Length')] = NumberObject(len(entries))
+        update.write(f"{xref_number} 0 obj\n".encode())
+        trailer.write_to_stream(update, None)
+        update.write(b"\nstream\n" + entries + b"\nendstream\nendobj\n")
+    else:
+        # Cross-reference section with the single new object
+        update.write(b"xref\n0 1\n0000000000 65535 f \n")
+        update.write(f"{info_number} 1\n{info_offset:010d} 00000 n \n".encode())
+        update.write(b"trailer\n")
+        trailer.write_to_stream(update, None)
+        update.write(b"\n")
+    update.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
+    
+    # Signed bytes: everything before and after the signature placeholder
+    update = bytearray(update.getbuffer())
+    byte_range = f"[0 {start + signature_start} {start + signature_end} {len(update) - signature_end}]"
+    update[byte_range_offset:byte_range_offset + len(byte_range)] = byte_range.encode()
+    return update, signature_start, signature_end
+
+def string_object_bytes(value):
+    """
+    Get the raw bytes of a PDF string object read from the document.
+    
+    PyPDF2 decodes binary strings to text whenever they happen to be valid
+    PDFDocEncoding, so the original bytes have to be recovered in that case.
+    
+    Args:
+        value (ByteStringObject or TextStringObject): PDF string object
+        
+    Returns:
+        bytes: Raw string bytes
+    """
+    if isinstance(value, TextStringObject):
+        return value.get_original_bytes()
+    return bytes(value)
+
 def create_signature_page(signature, initial_hash):
     """
     Create a PDF page containing the signature information.
@@ -118,7 +293,7 @@ def create_signature_page(signature, initial_hash):
     Returns:
         io.BytesIO: PDF page as a bytes buffer
     """
-    print("Creating signature page with signature details...")
+    logger.debug("Creating signature page with signature details...")
     buffer = io.BytesIO()
     c = canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
@@ -132,20 +307,20 @@ def create_signature_page(signature, initial_hash):
     c.drawString(72, height - 100, "This document has been digitally signed.")
     c.drawString(72, height - 120, "Signature Algorithm: RSA-SHA256")
     c.drawString(72, height - 140, "Document Hash: " + initial_hash.hex()[:16])
-    c.drawString(72, height - 160, "Signature Hash: " + hashlib.sha256(signature).hexdigest()[:16])
+    # Display-only fingerprint, so a fast non-signing hash is enough
+    c.drawString(72, height - 160, "Signature Hash: " + hashlib.blake2b(signature, digest_size=8).hexdigest())
     
     # Add signature value visualization (first 64 chars of hex representation)
     c.setFont("Courier", 10)
     c.drawString(72, height - 200, "Signature Value (Visualization):")
     
-    # Split signature into multiple lines
+    # Split signature into multiple lines, written as one text object
     line_length = 64
-    print("Adding signature visualization to page text:")
-    for i in range(0, min(len(signature.hex()), 256), line_length):
-        line_text = signature.hex()[i:i+line_length]
-        y_pos = height - 220 - (i // line_length * 15)
-        c.drawString(72, y_pos, line_text)
-        print(f"  Line at y={y_pos}: {line_text[:16]}...")
+    signature_hex = signature.hex()[:256]
+    text = c.beginText(72, height - 220)
+    text.setFont("Courier", 10, leading=15)
+    text.textLines([signature_hex[i:i+line_length] for i in range(0, len(signature_hex), line_length)])
+    c.drawText(text)
     
     c.save()
     buffer.seek(0)
@@ -162,81 +337,60 @@ def verify_pdf_signature(pdf_path, public_key_pem):
     Returns:
         bool: True if signature is valid, False otherwise
     """
-    with open(pdf_path, 'rb') as f:
-        pdf_content = f.read()
-        pdf_reader = PdfReader(io.BytesIO(pdf_content))
+    # Parse the PDF straight from a read-only mapping instead of copying
+    # the whole file into memory first
+    with open(pdf_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as pdf_content:
+        pdf_reader = PdfReader(pdf_content)
         
-        print("\n=== DETAILED SIGNATURE VERIFICATION DEBUGGING ===")
-        print(f"PDF File: {pdf_path}")
+        logger.debug("Verifying %s", pdf_path)
         
         # Check if this is a signed PDF
         if '/PAdES-Signature' not in pdf_reader.metadata:
-            print("ERROR: No PAdES-Signature metadata found!")
             raise ValueError("This PDF does not contain a PAdES signature")
-        else:
-            print(f"PAdES-Signature metadata found: {pdf_reader.metadata['/PAdES-Signature']}")
         
         # Extract the signature from the metadata
         if '/Signature' not in pdf_reader.metadata:
-            print("ERROR: No signature found in metadata!")
             raise ValueError("No signature found in document metadata")
         
-        signature_hex = pdf_reader.metadata['/Signature']
-        print(f"Found signature in metadata: {signature_hex[:16]}...")
+        # Get the range of signed bytes from metadata
+        if '/ByteRange' not in pdf_reader.metadata:
+            raise ValueError("No byte range found in document metadata")
+        
+        byte_range = [int(value) for value in pdf_reader.metadata['/ByteRange']]
+        logger.debug("Found byte range in metadata: %s", byte_range)
+        if len(byte_range) != 4 or byte_range[0] != 0 or not 0 < byte_range[1] < byte_range[2]:
+            raise ValueError("Invalid byte range in document metadata")
+        _, signature_start, signature_end, tail_length = byte_range
         
-        # Get initial hash from metadata
-        if '/InitialHash' not in pdf_reader.metadata:
-            print("ERROR: No initial hash found in metadata!")
-            raise ValueError("No initial hash found in document metadata")
+        # The signed ranges must reach the end of the file. Anything
+        # appended after them was added after signing.
+        if signature_end + tail_length != len(pdf_content):
+            logger.warning("%s was modified after signing", pdf_path)
+            return False
         
-        initial_hash_hex = pdf_reader.metadata['/InitialHash']
-        print(f"Found initial hash in metadata: {initial_hash_hex[:16]}...")
-        initial_hash = bytes.fromhex(initial_hash_hex)
+        # Only the signature value may sit between the signed ranges
+        signature_value = SIGNATURE_VALUE_PATTERN.fullmatch(pdf_content[signature_start:signature_end])
+        if signature_value is None:
+            raise ValueError("Invalid byte range in document metadata")
+        signature = bytes.fromhex(signature_value.group(1).decode())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Found signature in metadata: %s...", signature.hex()[:32])
         
         try:
-            # Convert hex to bytes
-            print("Converting signature from hex to bytes...")
-            signature = bytes.fromhex(signature_hex)
-            print(f"Signature bytes length: {len(signature)} bytes")
-            print(f"Signature first 16 bytes: {signature.hex()[:32]}")
-            
-            # Now calculate the hash of the content
-            print("\nCalculating document hash...")
-            pdf_hash = hashlib.sha256()
-            
-            # Create a new PDF writer to get the content without metadata
-            pdf_writer = PdfWriter()
-            
-            # Copy all pages from the original PDF
-            for page in pdf_reader.pages:
-                pdf_writer.add_page(page)
-            
-            # Get the PDF content without metadata
-            pdf_buffer = io.BytesIO()
-            pdf_writer.write(pdf_buffer)
-            pdf_content_to_hash = pdf_buffer.getvalue()
-            
-            # Hash the PDF content
-            pdf_hash.update(pdf_content_to_hash)
-            print(f"PDF content length: {len(pdf_content_to_hash)} bytes")
-            
-            # Add the initial hash to the content hash
-            pdf_hash.update(initial_hash)
-            print("Added initial hash to content hash")
-            
-            print(f"Final hash digest: {pdf_hash.hexdigest()}")
-            print(f"Hash bytes length: {len(pdf_hash.digest())} bytes")
+            # Now calculate the hash of the signed bytes
+            with memoryview(pdf_content) as signed_content:
+                pdf_hash = hashlib.sha256(signed_content[:signature_start])
+                pdf_hash.update(signed_content[signature_end:])
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Final hash digest: %s", pdf_hash.hexdigest())
             
             # Verify the signature
-            print("\nAttempting signature verification...")
-            print(f"Data hash to verify: {pdf_hash.hexdigest()}")
-            print(f"Data hash bytes length: {len(pdf_hash.digest())} bytes")
-            
             result = verify_signature(pdf_hash.digest(), signature, public_key_pem)
-            print(f"DEBUG: Verification result: {result}")
+            logger.info("Verification result for %s: %s", pdf_path, result)
             
             return result
             
         except Exception as e:
-            print(f"DEBUG: Verification exception: {str(e)}")
+            logger.error("Verification exception: %s", e)
             raise ValueError(f"Failed to verify signature: {str(e)}") 
\ No newline at end of file
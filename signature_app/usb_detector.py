@@ -2,53 +2,75 @@
 USB drive detection module for PAdES signature application.
 """
 import os
-import time
-import psutil
+import sys
 import platform
-import subprocess
 from PyQt5.QtCore import QThread, pyqtSignal
 
+# Drive detection shared with the other application lives in the common
+# package at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.drives import MountWatcher, get_removable_drives
+
+# Largest accepted private key file; a 4096-bit key file is about 3.3 KB
+MAX_KEY_FILE_SIZE = 64 * 1024
+
 class USBDetector(QThread):
     """
     Thread for monitoring USB drive connections and disconnections.
     Automatically detects and loads private keys from USB drives.
     """
     usb_connected = pyqtSignal(str, bytes)  # Signal with drive path and encrypted key data
-    usb_disconnected = pyqtSignal()
+    usb_disconnected = pyqtSignal(str)  # Signal with drive path
     status_update = pyqtSignal(str)  # Signal for status updates
     
     def __init__(self):
         super().__init__()
         self.running = True
         self.system = platform.system()
+        self.pending_status = []
         self.connected_drives = self.get_removable_drives()
         self.status_update.emit("USB detector initialized")
     
     def run(self):
         """
         Main thread loop for monitoring USB drives.
+        
+        Drives are re-scanned only when the OS reports a mount change
+        (see MountWatcher), or every one to two seconds where no
+        notification source is available.
         """
         # Check for existing drives with private keys when monitoring starts
         for drive in self.connected_drives:
             self.check_drive_for_key(drive)
         
-        while self.running:
-            current_drives = self.get_removable_drives()
-            
-            # Check for new drives
-            for drive in current_drives:
-                if drive not in self.connected_drives:
-                    self.status_update.emit(f"New drive detected: {drive}")
+        self.flush_status()
+        
+        watcher = MountWatcher(self.system)
+        try:
+            while self.running:
+                current_drives = self.get_removable_drives()
+                
+                # Check for new drives
+                for drive in current_drives - self.connected_drives:
+                    self.report_status(f"New drive detected: {drive}")
                     self.check_drive_for_key(drive)
-            
-            # Check for removed drives
-            for drive in self.connected_drives:
-                if drive not in current_drives:
-                    self.status_update.emit(f"Drive removed: {drive}")
-                    self.usb_disconnected.emit()
-            
-            self.connected_drives = current_drives
-            time.sleep(1)
+                
+                # Check for removed drives
+                for drive in self.connected_drives - current_drives:
+                    self.report_status(f"Drive removed: {drive}")
+                    self.usb_disconnected.emit(drive)
+                
+                if current_drives != self.connected_drives:
+                    watcher.reset_backoff()
+                self.connected_drives = current_drives
+                self.flush_status()
+                
+                # Wait for the next mount change, waking up every second
+                # to notice a stop request
+                while self.running and not watcher.wait(1):
+                    pass
+        finally:
+            watcher.close()
     
     def check_drive_for_key(self, drive_path):
         """
@@ -60,54 +82,48 @@ class USBDetector(QThread):
         key_path = os.path.join(drive_path, "private_key.enc")
         if os.path.exists(key_path):
             try:
-                with open(key_path, 'rb') as f:
+                # Unbuffered: the small key file is read in one system call,
+                # without copying it through a BufferedReader
+                with open(key_path, 'rb', buffering=0) as f:
+                    if os.fstat(f.fileno()).st_size > MAX_KEY_FILE_SIZE:
+                        raise ValueError("file is too large to be a private key")
                     encrypted_key_data = f.read()
-                self.status_update.emit(f"Private key found on {drive_path}")
+                self.report_status(f"Private key found on {drive_path}")
                 self.usb_connected.emit(drive_path, encrypted_key_data)
             except Exception as e:
-                self.status_update.emit(f"Error reading private key: {str(e)}")
+                self.report_status(f"Error reading private key: {str(e)}")
+    
+    def report_status(self, message):
+        """
+        Queue a status message, sent together with the other messages of
+        the same scan by flush_status.
+        
+        Args:
+            message (str): Status message
+        """
+        self.pending_status.append(message)
+    
+    def flush_status(self):
+        """
+        Emit the status messages queued since the last flush as a single update.
+        """
+        if self.pending_status:
+            self.status_update.emit(" | ".join(self.pending_status))
+            self.pending_status.clear()
     
     def get_removable_drives(self):
         """
-        Get a list of removable drives.
+        Get the set of removable drives, reporting scan errors as status
+        messages.
         
         Returns:
-            list: List of drive paths
+            set: Set of absolute paths to mounted removable drives
         """
-        drives = []
-        
-        if self.system == "Darwin":  # macOS
-            try:
-                if os.path.exists("/Volumes"):
-                    volumes = os.listdir("/Volumes")
-                    for volume in volumes:
-                        volume_path = os.path.join("/Volumes", volume)
-                        
-                        # Skip if not a mount point
-                        if not os.path.ismount(volume_path):
-                            continue
-                            
-                        # Skip system volumes and Time Machine backups
-                        if any(x in volume for x in ["Macintosh", "System", "Time Machine", "com.apple"]):
-                            continue
-                            
-                        # Get filesystem info
-                        try:
-                            st = os.statvfs(volume_path)
-                            # Check if volume is writable
-                            if (st.f_flag & os.ST_RDONLY) == 0:
-                                drives.append(volume_path)
-                        except:
-                            pass
-            except Exception as e:
-                self.status_update.emit(f"Error detecting drives: {str(e)}")
-        else:
-            # For other systems (Windows/Linux), use psutil
-            for partition in psutil.disk_partitions():
-                if 'removable' in partition.opts or 'cdrom' in partition.opts:
-                    drives.append(partition.mountpoint)
-        
-        return drives
+        try:
+            return get_removable_drives(self.system)
+        except Exception as e:
+            self.report_status(f"Error detecting drives: {str(e)}")
+            return set()
     
     def stop_monitoring(self):
         """
@@ -0,0 +1,91 @@
+"""
+Background worker threads for the signature application.
+"""
+from PyQt5.QtCore import QThread, pyqtSignal
+from crypto import decrypt_private_key, load_private_key
+from pdf_handler import sign_pdf, verify_pdf_signature
+
+class SigningWorker(QThread):
+    """
+    Thread decrypting the private key and signing a PDF document.
+    Keeps the GUI responsive while the key is derived and the document is hashed and signed.
+    """
+    progress = pyqtSignal(int)  # Signal with progress percentage
+    key_loaded = pyqtSignal(object)  # Signal with the loaded private key
+    document_signed = pyqtSignal(str)  # Signal with signed PDF path
+    error = pyqtSignal(str)  # Signal with error message
+
+    def __init__(self, pdf_path, output_path, private_key, encrypted_key_data, pin):
+        """
+        Args:
+            pdf_path (str): Path to the PDF to sign
+            output_path (str): Path to save the signed PDF
+            private_key (RSAPrivateKey): Already loaded private key, or None
+                to decrypt it from encrypted_key_data with the PIN
+            encrypted_key_data (bytes): Encrypted private key data
+            pin (str): User PIN
+        """
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.output_path = output_path
+        self.private_key = private_key
+        self.encrypted_key_data = encrypted_key_data
+        self.pin = pin
+
+    def run(self):
+        """
+        Load the private key if needed and sign the document.
+        """
+        try:
+            # Decrypt and load the private key
+            private_key = self.private_key
+            if private_key is None:
+                try:
+                    private_key = load_private_key(decrypt_private_key(self.encrypted_key_data, self.pin))
+                finally:
+                    # Drop the PIN as soon as it has been used
+                    self.pin = None
+                self.key_loaded.emit(private_key)
+
+            self.progress.emit(30)
+
+            # Sign the PDF
+            sign_pdf(self.pdf_path, self.output_path, private_key)
+
+            self.progress.emit(100)
+            self.document_signed.emit(self.output_path)
+
+        except Exception as e:
+            self.error.emit(str(e))
+
+class VerificationWorker(QThread):
+    """
+    Thread verifying the signature of a signed PDF document.
+    Keeps the GUI responsive while the document is parsed and hashed.
+    """
+    verified = pyqtSignal(bool)  # Signal with verification result
+    verification_error = pyqtSignal(str)  # Signal with error raised by the verification
+    error = pyqtSignal(str)  # Signal with error message for unreadable files
+
+    def __init__(self, pdf_path, public_key_path):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.public_key_path = public_key_path
+
+    def run(self):
+        """
+        Load the public key and verify the document signature.
+        """
+        try:
+            # Load public key
+            with open(self.public_key_path, 'rb') as f:
+                public_key_data = f.read()
+
+            # Verify the signature
+            try:
+                self.verified.emit(verify_pdf_signature(self.pdf_path, public_key_data))
+            except ValueError as ve:
+                self.verification_error.emit(str(ve))
+
+        except Exception as e:
+            self.error.emit(str(e))
@@ -0,0 +1,101 @@
+"""
+Tests for the removable drive detection shared by both applications.
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import drives
+
+MOUNTINFO = b"""\
+22 1 8:2 / / rw,relatime shared:1 - ext4 /dev/sda2 rw
+25 22 8:1 / /boot/efi rw,relatime shared:2 - vfat /dev/sda1 rw,fmask=0077
+41 22 8:17 / /media/user/KEY rw,nosuid,nodev shared:30 - vfat /dev/sdb1 rw,uid=1000
+42 22 8:33 / /media/user/My\\040Drive rw,nosuid,nodev shared:31 master:1 - exfat /dev/sdc1 rw
+43 22 8:49 / /media/user/Backup rw,nosuid,nodev shared:32 - fuseblk /dev/sdd1 rw,user_id=0
+44 22 0:40 / /run/user/1000 rw,nosuid,nodev shared:33 - tmpfs tmpfs rw,size=1000k
+45 22 8:65 / /media/user/Broken rw,nosuid shared:34 vfat /dev/sde1 rw
+46 22 8:81 - vfat /dev/sdf1
+"""
+
+# Devices on USB disks in the sample above
+USB_DEVICES = {"/dev/sdb1", "/dev/sdc1", "/dev/sdd1", "/dev/sde1", "/dev/sdf1"}
+
+class MountinfoTest(unittest.TestCase):
+    def get_linux_drives(self, mountinfo):
+        with mock.patch("builtins.open", mock.mock_open(read_data=mountinfo)), \
+                mock.patch.object(drives, "is_removable_device", side_effect=USB_DEVICES.__contains__):
+            return drives.get_removable_drives("Linux")
+
+    def test_removable_mounts_are_reported(self):
+        self.assertEqual(self.get_linux_drives(MOUNTINFO), {
+            "/media/user/KEY",
+            "/media/user/My Drive",
+            "/media/user/Backup",
+        })
+
+    def test_malformed_lines_are_skipped(self):
+        self.assertEqual(self.get_linux_drives(b"garbage\n\n" + MOUNTINFO + b"47 22\n"), {
+            "/media/user/KEY",
+            "/media/user/My Drive",
+            "/media/user/Backup",
+        })
+
+    def test_internal_vfat_partition_is_skipped(self):
+        self.assertNotIn("/boot/efi", self.get_linux_drives(MOUNTINFO))
+
+    def test_unescape_mountinfo(self):
+        self.assertEqual(drives.unescape_mountinfo(b"/media/a\\040b\\011c\\134d"), "/media/a b\tc\\d")
+        self.assertEqual(drives.unescape_mountinfo(b"/media/plain"), "/media/plain")
+
+    def test_non_device_sources_are_not_removable(self):
+        self.assertFalse(drives.is_removable_device("tmpfs"))
+        self.assertFalse(drives.is_removable_device("server:/export"))
+
+MOUNT_OUTPUT = """\
+/dev/disk3s1s1 on / (apfs, sealed, local, read-only, journaled)
+devfs on /dev (devfs, local, nobrowse)
+/dev/disk3s5 on /System/Volumes/Data (apfs, local, journaled, nobrowse, protect)
+map auto_home on /System/Volumes/Data/home (autofs, automounted, nobrowse)
+/dev/disk4s1 on /Volumes/KEY (msdos, local, nodev, nosuid, noowners)
+/dev/disk5s1 on /Volumes/Trip on Mars (exfat, local, nodev, nosuid, noowners)
+/dev/disk6s2 on /Volumes/Installer (hfs, local, nodev, nosuid, read-only, noowners, quarantine, mounted by user)
+/dev/disk7s1 on /Volumes/Hidden (apfs, local, nodev, nosuid, journaled, noowners, nobrowse)
+/dev/disk8s2 on /Volumes/Time Machine Backups (apfs, local, nodev, nosuid, journaled, noowners)
+//user@server/share on /Volumes/share (smbfs, nodev, nosuid, mounted by user)
+"""
+
+class MountOutputTest(unittest.TestCase):
+    def test_removable_volumes_are_reported(self):
+        with mock.patch.object(drives.subprocess, "run") as run:
+            run.return_value.stdout = MOUNT_OUTPUT
+            self.assertEqual(drives.get_removable_drives("Darwin"), {
+                "/Volumes/KEY",
+                "/Volumes/Trip on Mars",
+            })
+        run.assert_called_once()
+
+class PollingBackoffTest(unittest.TestCase):
+    def setUp(self):
+        # No notification source exists on Windows, so the watcher polls
+        self.watcher = drives.MountWatcher("Windows")
+        patcher = mock.patch.object(drives.time, "sleep")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def rescan_times(self, seconds):
+        return [second for second in range(1, seconds + 1) if self.watcher.wait(1)]
+
+    def test_interval_backs_off_to_the_maximum(self):
+        self.assertEqual(self.rescan_times(7), [1, 3, 5, 7])
+
+    def test_reset_after_change(self):
+        self.rescan_times(3)
+        self.watcher.reset_backoff()
+        self.assertEqual(self.rescan_times(5), [1, 3, 5])
+
+if __name__ == '__main__':
+    unittest.main()
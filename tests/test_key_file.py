@@ -0,0 +1,53 @@
+"""
+Tests for the encrypted private key file shared by both applications.
+
+The key generator writes the file and the signature application reads it,
+so each side is loaded from its own directory.
+"""
+import importlib.util
+import os
+import unittest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_crypto(application):
+    spec = importlib.util.spec_from_file_location(
+        f"{application}_crypto", os.path.join(ROOT, application, "crypto.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+key_generator_crypto = load_crypto("key_generator")
+signature_app_crypto = load_crypto("signature_app")
+
+class KeyFileTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.private_key_pem = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        cls.encrypted = key_generator_crypto.encrypt_private_key(cls.private_key_pem, "123456")
+
+    def test_round_trip(self):
+        self.assertTrue(self.encrypted.startswith(b"ESK2"))
+        self.assertEqual(signature_app_crypto.decrypt_private_key(self.encrypted, "123456"),
+                         self.private_key_pem)
+
+    def test_wrong_pin(self):
+        with self.assertRaisesRegex(ValueError, "^Invalid PIN$"):
+            signature_app_crypto.decrypt_private_key(self.encrypted, "654321")
+
+    def test_missing_magic(self):
+        with self.assertRaisesRegex(ValueError, "Unsupported private key file format"):
+            signature_app_crypto.decrypt_private_key(self.encrypted[4:], "123456")
+
+    def test_truncated_ciphertext(self):
+        with self.assertRaises(ValueError):
+            signature_app_crypto.decrypt_private_key(self.encrypted[:-16], "123456")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Tests for signing and verifying PDF documents.
+"""
+import os
+import struct
+import sys
+import tempfile
+import unittest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from PyPDF2 import PdfReader
+from reportlab.pdfgen import canvas
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'signature_app'))
+
+from pdf_handler import find_startxref, sign_pdf, sign_pdfs, verify_pdf_signature
+
+def write_xref_stream_pdf(path):
+    """
+    Write a single-page PDF 1.5 document indexed by a cross-reference stream.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] /Contents 4 0 R >>",
+        b"<< /Length 22 >>\nstream\nBT /F1 12 Tf (hi) Tj ET\nendstream",
+    ]
+    content = bytearray(b"%PDF-1.5\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(content))
+        content += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    offsets.append(len(content))
+    entries = b"\x00\x00\x00\xff" + b"".join(b"\x01" + struct.pack(">H", offset) + b"\x00" for offset in offsets)
+    content += b"5 0 obj\n<< /Type /XRef /Size 6 /W [1 2 1] /Root 1 0 R /Length %d >>\nstream\n" % len(entries)
+    content += entries + b"\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n" % offsets[-1]
+    with open(path, 'wb') as f:
+        f.write(content)
+
+class PdfSignatureTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        cls.public_key_pem = cls.private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.input_path = os.path.join(self.directory.name, 'document.pdf')
+        self.output_path = os.path.join(self.directory.name, 'document_signed.pdf')
+
+        c = canvas.Canvas(self.input_path, pageCompression=0)
+        c.drawString(72, 720, "Original content")
+        c.showPage()
+        c.save()
+        sign_pdf(self.input_path, self.output_path, self.private_key)
+        with open(self.output_path, 'rb') as f:
+            self.signed = f.read()
+
+    def write(self, content):
+        path = os.path.join(self.directory.name, 'modified.pdf')
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def is_valid(self, path):
+        try:
+            return verify_pdf_signature(path, self.public_key_pem)
+        except ValueError:
+            return False
+
+    def test_signed_document_verifies(self):
+        self.assertTrue(verify_pdf_signature(self.output_path, self.public_key_pem))
+
+    def test_modified_content_fails(self):
+        path = self.write(self.signed.replace(b"Original content", b"Modified content"))
+        self.assertFalse(self.is_valid(path))
+
+    def test_modified_metadata_fails(self):
+        path = self.write(self.signed.replace(b"/Trapped /False", b"/Trapped /True"))
+        self.assertFalse(self.is_valid(path))
+
+    def test_forged_incremental_update_fails(self):
+        # Replace the signature update with one that carries the signed
+        # information dictionary and also replaces the page content, ending
+        # with a single %%EOF
+        reader = PdfReader(self.output_path)
+        contents_number = reader.pages[0].raw_get('/Contents').idnum
+        info = reader.trailer.raw_get('/Info')
+        size = int(reader.trailer['/Size'])
+        start = self.signed.index(f"{info.idnum} 0 obj".encode())
+        info_object = self.signed[start:self.signed.index(b"endobj", start) + 6]
+
+        with open(self.input_path, 'rb') as f:
+            original = f.read()
+
+        content = b"BT /F1 12 Tf 72 720 Td (FORGED) Tj ET"
+        forged = bytearray(self.signed[:start])
+        info_offset = len(forged)
+        forged += info_object + b"\n"
+        contents_offset = len(forged)
+        forged += f"{contents_number} 0 obj\n<< /Length {len(content)} >>\nstream\n".encode()
+        forged += content + b"\nendstream\nendobj\n"
+        xref_offset = len(forged)
+        forged += b"xref\n0 1\n0000000000 65535 f \n"
+        forged += f"{info.idnum} 1\n{info_offset:010d} 00000 n \n".encode()
+        forged += f"{contents_number} 1\n{contents_offset:010d} 00000 n \n".encode()
+        forged += (f"trailer\n<< /Size {size} /Root {reader.trailer.raw_get('/Root').idnum} 0 R "
+                   f"/Info {info.idnum} 0 R /Prev {find_startxref(original)} >>\n"
+                   f"startxref\n{xref_offset}\n%%EOF\n").encode()
+        path = self.write(forged)
+
+        self.assertIn("FORGED", PdfReader(path).pages[0].extract_text())
+        self.assertFalse(self.is_valid(path))
+
+    def test_sign_several_documents(self):
+        jobs = [(self.input_path, os.path.join(self.directory.name, f"batch{i}.pdf")) for i in range(2)]
+        sign_pdfs(jobs, self.private_key)
+        for _, output_path in jobs:
+            self.assertTrue(verify_pdf_signature(output_path, self.public_key_pem))
+
+    def test_xref_stream_document(self):
+        input_path = os.path.join(self.directory.name, 'xref_stream.pdf')
+        output_path = os.path.join(self.directory.name, 'xref_stream_signed.pdf')
+        write_xref_stream_pdf(input_path)
+        sign_pdf(input_path, output_path, self.private_key)
+
+        # The update indexes its objects with a stream as well
+        with open(input_path, 'rb') as f:
+            original_size = len(f.read())
+        with open(output_path, 'rb') as f:
+            update = f.read()[original_size:]
+        self.assertIn(b"/Type /XRef", update)
+        self.assertNotIn(b"trailer", update)
+
+        reader = PdfReader(output_path, strict=True)
+        self.assertEqual(len(reader.pages), 1)
+        self.assertIn('/PAdES-Signature', reader.metadata)
+        self.assertTrue(verify_pdf_signature(output_path, self.public_key_pem))
+
+if __name__ == '__main__':
+    unittest.main()